@@ -1,2 +1,2 @@
-from .config import YFINANCE_TICKERS, MT5_TICKERS
-__all__ = ['YFINANCE_TICKERS', 'MT5_TICKERS']
\ No newline at end of file
+from .config import TICKER_CATEGORIES, TICKER_TO_CATEGORY, ALL_TICKERS
+__all__ = ['TICKER_CATEGORIES', 'TICKER_TO_CATEGORY', 'ALL_TICKERS']
\ No newline at end of file
@@ -1,5 +1,5 @@
 TICKER_CATEGORIES = {
-    "Raw Materials": [
+    "Raw Materials": (
         "GC=F",  # Gold
         "SI=F",  # Silver
         "CL=F",  # Crude Oil
@@ -7,27 +7,36 @@ TICKER_CATEGORIES = {
         "ZC=F",  # Corn
         "BHP",   # BHP Group (diversified mining)
         "RIO",   # Rio Tinto
-    ],
-    "Crypto": [
+    ),
+    "Crypto": (
         "BTC-USD", # Bitcoin
         "ETH-USD", # Ethereum
         "XRP-USD", # Ripple
         "ADA-USD", # Cardano
         "SOL-USD", # Solana
-    ],
-    "Enterprise Assets": [
+    ),
+    "Enterprise Assets": (
         "MSFT",  # Microsoft
         "CRM",   # Salesforce
         "ORCL",  # Oracle
         "ADBE",  # Adobe
         "SAP",   # SAP
         "NOW",   # ServiceNow
-    ],
-    "ETFs": [
+    ),
+    "ETFs": (
         "SPY",   # SPDR S&P 500 ETF Trust
         "QQQ",   # Invesco QQQ Trust (NASDAQ-100)
         "GLD",   # SPDR Gold Shares
         "USO",   # United States Oil Fund
-    ]
+    )
 }
 
+# Reverse index built once at import: ticker -> category in O(1).
+TICKER_TO_CATEGORY = {
+    ticker: category
+    for category, tickers in TICKER_CATEGORIES.items()
+    for ticker in tickers
+}
+ALL_TICKERS = tuple(TICKER_TO_CATEGORY)
+
+__all__ = ['TICKER_CATEGORIES', 'TICKER_TO_CATEGORY', 'ALL_TICKERS']
@@ -12,6 +12,8 @@ class AdjustedRiskFreeRate(BaseIndicator):
     Adjusted Rate = (1 + Foreign Risk-Free Rate) * (1 + Expected Exchange Rate Change) - 1
     """
 
+    __slots__ = ("foreign_risk_free_rate", "expected_exchange_rate_change")
+
     def __init__(self, foreign_risk_free_rate: float, expected_exchange_rate_change: float):
         """
         Initializes the AdjustedRiskFreeRate indicator.
@@ -1,5 +1,8 @@
 # A recommended base class for all financial indicators
 class BaseIndicator:
+    # Subclasses list their own attributes in __slots__: no per-instance __dict__.
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         """Initializes the base indicator."""
         pass
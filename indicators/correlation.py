@@ -1,8 +1,6 @@
-from base import BaseIndicator
+from .base import BaseIndicator
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
 
 class CorrelationIndicator(BaseIndicator):
     """
@@ -12,6 +10,8 @@ class CorrelationIndicator(BaseIndicator):
     identificar cambios de régimen en la relación entre dos activos.
     """
 
+    __slots__ = ("asset_a_prices", "asset_b_prices", "window_size")
+
     def __init__(self, asset_a_prices: pd.Series, asset_b_prices: pd.Series, window_size: int):
         """
         Inicializa el CorrelationIndicator.
@@ -34,56 +34,112 @@ class CorrelationIndicator(BaseIndicator):
         """
         Realiza el cálculo de la correlación móvil.
 
+        Las sumas de cada ventana (x, y, x*y, x², y²) se obtienen como diferencias
+        de sumas acumuladas, por lo que el costo es O(N) en lugar de O(N·W).
+        Para que esas diferencias no pierdan precisión en series con tendencia,
+        las sumas acumuladas se reinician en cada bloque de W ventanas, con los
+        datos del bloque centrados en su propia media.
+
         Returns:
             pd.Series: Una serie de pandas que contiene la correlación móvil
                        entre los dos activos para cada punto en el tiempo.
                        Los primeros 'window_size - 1' valores serán NaN.
         """
-        rolling_correlation = self.asset_a_prices.rolling(
-            window=self.window_size
-        ).corr(
-            self.asset_b_prices
-        )
-        return rolling_correlation
+        x = np.asarray(self.asset_a_prices, dtype=np.float64)
+        y = np.asarray(self.asset_b_prices, dtype=np.float64)
+        w = self.window_size
+        n = len(x)
+        rolling_correlation = np.full(n, np.nan)
+
+        if n >= w:
+            # Las ventanas que empiezan en el bloque k (posiciones k·W .. k·W+W-1) solo
+            # usan los 2W-1 datos que arrancan en k·W: cada fila de `segments` es uno
+            # de esos tramos (relleno con NaN al final para completar el último bloque).
+            n_windows = n - w + 1
+            n_blocks = -(-n_windows // w)
+            padded = n_blocks * w + w - 1
+
+            def segments(values: np.ndarray) -> np.ndarray:
+                values = np.concatenate((values, np.full(padded - n, np.nan)))
+                return np.lib.stride_tricks.sliding_window_view(values, 2 * w - 1)[::w]
+
+            xs, ys = segments(x), segments(y)
+            # Igual que pandas, una ventana con algún dato faltante queda en NaN.
+            valid = ~(np.isnan(xs) | np.isnan(ys))
+            n_valid = valid.sum(axis=1, keepdims=True)
+
+            # Centrar cada tramo en su media no cambia la correlación, pero deja
+            # las sumas del orden de la variación local y evita la cancelación
+            # en W*Sxx - Sx² aunque el precio recorra varios órdenes de magnitud.
+            with np.errstate(invalid="ignore", divide="ignore"):
+                x_mean = np.where(valid, xs, 0.0).sum(axis=1, keepdims=True) / n_valid
+                y_mean = np.where(valid, ys, 0.0).sum(axis=1, keepdims=True) / n_valid
+            xs = np.where(valid, xs - x_mean, 0.0)
+            ys = np.where(valid, ys - y_mean, 0.0)
+
+            def window_sums(values: np.ndarray) -> np.ndarray:
+                # Fila k, columna m: suma de la ventana que empieza en k·W + m
+                prefix = np.concatenate((np.zeros((len(values), 1)), np.cumsum(values, axis=1)), axis=1)
+                return (prefix[:, w:] - prefix[:, :w]).ravel()[:n_windows]
+
+            n_w = window_sums(valid.astype(np.float64))
+            sx, sy = window_sums(xs), window_sums(ys)
+            sxx, syy, sxy = window_sums(xs * xs), window_sums(ys * ys), window_sums(xs * ys)
+
+            var_x = w * sxx - sx * sx
+            var_y = w * syy - sy * sy
+            defined = (n_w == w) & (var_x > 0) & (var_y > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = (w * sxy - sx * sy) / np.sqrt(var_x * var_y)
+            rolling_correlation[w - 1:] = np.where(defined, corr, np.nan)
+
+        return pd.Series(rolling_correlation, index=self.asset_a_prices.index)
     
 
-# El ejemplo no estaba funcionando a la hora de codificar el método. YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')
-# Puede que tenga errores.
-
-# 1. Definir los tickers y el período de tiempo
-ticker_a = 'KO'  
-ticker_b = 'PEP'  
-start_date = datetime.now() - timedelta(days=365)
-end_date = datetime.now()
-
-# 2. Descargar los datos históricos usando yfinance
-data = yf.download([ticker_a, ticker_b], start=start_date, end=end_date)
-
-precios_a = data['Close'][ticker_a]
-precios_b = data['Close'][ticker_b]
-
-# Eliminar cualquier fila con datos faltantes si yfinance no devuelve datos para un día
-precios_a.dropna(inplace=True)
-precios_b.dropna(inplace=True)
-common_index = precios_a.index.intersection(precios_b.index)
-precios_a = precios_a.loc[common_index]
-precios_b = precios_b.loc[common_index]
-
-
-# 3. Instanciar y usar el indicador
-# Usaremos una correlación móvil de 60 días (aprox. 3 meses de trading)
-ventana_correlacion = 60
-corr_indicator = CorrelationIndicator(
-    asset_a_prices=precios_a,
-    asset_b_prices=precios_b,
-    window_size=ventana_correlacion
-)
-
-# 4. Calcular los valores del indicador
-serie_correlacion = corr_indicator.calculate()
-
-# 5. Mostrar los últimos valores de la correlación
-print(f"\n--- Correlación Móvil de {ventana_correlacion} días para {ticker_a}/{ticker_b} (últimos 10 valores) ---")
-print(serie_correlacion.tail(10))
-
-
+# --- Example Usage ---
+# Se ejecuta con `python -m indicators.correlation`; importar el módulo no descarga nada.
+if __name__ == '__main__':
+    # El ejemplo no estaba funcionando a la hora de codificar el método. YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')
+    # Puede que tenga errores.
+    from datetime import date, timedelta
+    from functools import lru_cache
+    import yfinance as yf
+
+    @lru_cache(maxsize=None)
+    def descargar_cierres(ticker: str, start: date, end: date) -> pd.Series:
+        """Descarga (una sola vez por ticker y rango de fechas) los precios de cierre."""
+        return yf.download(ticker, start=start, end=end, multi_level_index=False)['Close']
+
+    # 1. Definir los tickers y el período de tiempo
+    ticker_a = 'KO'
+    ticker_b = 'PEP'
+    end_date = date.today()
+    start_date = end_date - timedelta(days=365)
+
+    # 2. Descargar los datos históricos usando yfinance
+    precios_a = descargar_cierres(ticker_a, start_date, end_date)
+    precios_b = descargar_cierres(ticker_b, start_date, end_date)
+
+    # Eliminar cualquier fila con datos faltantes si yfinance no devuelve datos para un día
+    precios_a = precios_a.dropna()
+    precios_b = precios_b.dropna()
+    common_index = precios_a.index.intersection(precios_b.index)
+    precios_a = precios_a.loc[common_index]
+    precios_b = precios_b.loc[common_index]
+
+
+    # 3. Instanciar y usar el indicador
+    # Usaremos una correlación móvil de 60 días (aprox. 3 meses de trading)
+    ventana_correlacion = 60
+    corr_indicator = CorrelationIndicator(
+        asset_a_prices=precios_a,
+        asset_b_prices=precios_b,
+        window_size=ventana_correlacion
+    )
+
+    # 4. Calcular los valores del indicador
+    serie_correlacion = corr_indicator.calculate()
+
+    # 5. Mostrar los últimos valores de la correlación
+    print(f"\n--- Correlación Móvil de {ventana_correlacion} días para {ticker_a}/{ticker_b} (últimos 10 valores) ---")
+    print(serie_correlacion.tail(10))
@@ -1,6 +1,12 @@
 from .base import BaseIndicator
 import numpy as np
-from typing import List, Union
+from scipy.stats import norm
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import cupy as cp
+except ImportError:  # cupy is optional; backend="cupy" falls back to NumPy
+    cp = None
 
 class ExpectedShortfallMonteCarlo(BaseIndicator):
     """
@@ -10,13 +16,25 @@ class ExpectedShortfallMonteCarlo(BaseIndicator):
     the expected loss on a portfolio in the worst-case scenarios. It is the average
     of all losses that are greater than or equal to the Value at Risk (VaR) at a
     given confidence level.
+
+    Since the simulated returns are Normal, the same quantity also has a closed
+    form, available through ``method="analytic"``.
     """
 
+    # (z_alpha, phi(z_alpha)) of the standard normal, keyed by confidence level.
+    _normal_tail_cache: Dict[float, Tuple[float, float]] = {}
+
+    __slots__ = ("returns", "confidence_level", "simulations", "time_horizon", "alpha",
+                 "method", "seed", "_mu", "_sigma", "_rng", "backend", "_gpu_rng", "_gpu_stream")
+
     def __init__(self,
                  returns: Union[List[float], np.ndarray],
                  confidence_level: float = 0.95,
                  simulations: int = 10000,
-                 time_horizon: int = 1):
+                 time_horizon: int = 1,
+                 method: str = "mc",
+                 seed: Optional[int] = None,
+                 backend: str = "numpy"):
         """
         Initializes the ExpectedShortfallMonteCarlo indicator.
 
@@ -29,64 +47,137 @@ class ExpectedShortfallMonteCarlo(BaseIndicator):
                                Defaults to 10000.
             time_horizon (int): The time horizon for the projection, in the same period unit
                                 as the returns (e.g., days if using daily returns). Defaults to 1.
+            method (str): "mc" to estimate ES by Monte Carlo simulation, or "analytic" to
+                          use the closed-form Normal ES (no simulation). Defaults to "mc".
+            seed (Optional[int]): Seed for this instance's random generator, for
+                                  reproducible simulations. Defaults to None.
+            backend (str): "numpy" to simulate on the CPU, or "cupy" to simulate on the GPU
+                           (worth it for millions of simulations). Falls back to NumPy
+                           when CuPy is not installed. Defaults to "numpy".
         """
         super().__init__()
-        if not isinstance(returns, np.ndarray):
-            returns = np.array(returns)
+        # No copy when the caller already passes a contiguous float64 array.
+        returns = np.ascontiguousarray(returns, dtype=np.float64)
+        if returns.ndim != 1:
+            returns = returns.reshape(-1)
 
-        if returns.ndim != 1 or len(returns) == 0:
-            raise ValueError("Returns must be a non-empty 1D array or list.")
+        if returns.size == 0:
+            raise ValueError("Returns must be a non-empty array or list.")
 
         if not (0 < confidence_level < 1):
             raise ValueError("Confidence level must be between 0 and 1.")
 
+        if method not in ("mc", "analytic"):
+            raise ValueError("Method must be either 'mc' or 'analytic'.")
+
+        if backend not in ("numpy", "cupy"):
+            raise ValueError("Backend must be either 'numpy' or 'cupy'.")
+
         self.returns = returns
         self.confidence_level = confidence_level
         self.simulations = simulations
         self.time_horizon = time_horizon
         self.alpha = 1 - confidence_level
+        self.method = method
+        self.seed = seed
+        # The returns don't change after construction, so their moments are taken once here.
+        self._mu = float(returns.mean())
+        self._sigma = float(returns.std())
+        # Per-instance PCG64 generator: faster than the legacy global Mersenne
+        # Twister state and safe to use from several threads at once.
+        self._rng = np.random.default_rng(seed)
+        self.backend = backend if cp is not None else "numpy"
+        self._gpu_rng = None
+        self._gpu_stream = None
 
     def calculate(self) -> float:
         """
         Performs the Monte Carlo simulation to calculate Expected Shortfall.
 
         The method simulates future returns using the historical mean and standard
-        deviation of the provided returns data. It then calculates VaR and averages
-        the tail losses beyond the VaR to compute ES.
+        deviation of the provided returns data. It then selects the tail losses
+        beyond the VaR and averages them to compute ES.
 
         Returns:
             float: The calculated Expected Shortfall as a negative value,
                    representing a loss.
         """
-        # --- Step 1: Calculate historical mean and standard deviation ---
-        # These will be the parameters for our random walk simulation.
-        mu = np.mean(self.returns)
-        sigma = np.std(self.returns)
+        # --- Step 1: Historical mean and standard deviation ---
+        # These are the parameters for our random walk simulation (computed in __init__).
+        mu, sigma = self._mu, self._sigma
+
+        if self.method == "analytic":
+            return self._analytic_expected_shortfall(mu, sigma)
+
+        if self.backend == "cupy":
+            return self._cupy_expected_shortfall(mu, sigma)
 
         # --- Step 2: Run Monte Carlo Simulation ---
         # We simulate 'simulations' number of possible outcomes for the portfolio's
         # return over the specified 'time_horizon'.
         # We assume returns follow a normal distribution (a common assumption in finance).
-        simulated_returns = np.random.normal(
-            loc=mu * self.time_horizon,
-            scale=sigma * np.sqrt(self.time_horizon),
-            size=self.simulations
-        )
+        # Standard normals are drawn in float32 (half the memory traffic of float64)
+        # and shifted/scaled in place, so only one buffer is ever allocated.
+        simulated_returns = self._rng.standard_normal(self.simulations, dtype=np.float32)
+        simulated_returns *= sigma * np.sqrt(self.time_horizon)
+        simulated_returns += mu * self.time_horizon
 
-        # --- Step 3: Calculate Value at Risk (VaR) ---
+        # --- Step 3: Select the tail beyond the Value at Risk (VaR) ---
         # VaR is the threshold of loss we don't expect to exceed with the given
-        # confidence level. It's calculated as a percentile of the simulated returns.
-        # For example, for a 95% confidence level, VaR is the 5th percentile of returns.
-        var = np.percentile(simulated_returns, self.alpha * 100)
+        # confidence level, i.e. the alpha-quantile of the simulated returns.
+        # Instead of sorting everything (np.percentile) and then masking, a partial
+        # partition moves the k worst outcomes to the front in O(n).
+        k = max(int(self.alpha * self.simulations), 1)
+        tail_losses = np.partition(simulated_returns, k - 1)[:k]
 
         # --- Step 4: Calculate Expected Shortfall (ES) ---
-        # ES is the average of the returns that are worse (less than or equal to) the VaR.
+        # ES is the average of the returns that are worse than (or equal to) the VaR.
         # This gives us the expected value of our loss if we hit that tail event.
-        tail_losses = simulated_returns[simulated_returns <= var]
-        expected_shortfall = np.mean(tail_losses)
+        expected_shortfall = tail_losses.mean(dtype=np.float64)
 
         return float(expected_shortfall)
 
+    def _cupy_expected_shortfall(self, mu: float, sigma: float) -> float:
+        """
+        Same simulation as `calculate`, run on the GPU with CuPy. All draws stay in
+        device memory; only the final mean is copied back to the host.
+
+        Returns:
+            float: The Expected Shortfall as a negative value, representing a loss.
+        """
+        if self._gpu_rng is None:
+            self._gpu_rng = cp.random.default_rng(self.seed)
+            self._gpu_stream = cp.cuda.Stream(non_blocking=True)
+
+        with self._gpu_stream:
+            simulated_returns = self._gpu_rng.standard_normal(self.simulations, dtype=cp.float32)
+            simulated_returns *= sigma * np.sqrt(self.time_horizon)
+            simulated_returns += mu * self.time_horizon
+
+            k = max(int(self.alpha * self.simulations), 1)
+            tail_losses = cp.partition(simulated_returns, k - 1)[:k]
+            expected_shortfall = tail_losses.mean(dtype=cp.float64)
+
+        return float(expected_shortfall.get(stream=self._gpu_stream))
+
+    def _analytic_expected_shortfall(self, mu: float, sigma: float) -> float:
+        """
+        Closed-form Expected Shortfall of a Normal(mu*h, sigma*sqrt(h)) return:
+        ES = mu*h - sigma*sqrt(h) * phi(z_alpha) / alpha
+
+        Returns:
+            float: The Expected Shortfall as a negative value, representing a loss.
+        """
+        tail = self._normal_tail_cache.get(self.confidence_level)
+        if tail is None:
+            z_alpha = norm.ppf(self.alpha)
+            tail = (float(z_alpha), float(norm.pdf(z_alpha)))
+            self._normal_tail_cache[self.confidence_level] = tail
+        _, pdf_z_alpha = tail
+
+        h = self.time_horizon
+        return float(mu * h - sigma * np.sqrt(h) * pdf_z_alpha / self.alpha)
+
 
 # --- Example Usage ---
 if __name__ == '__main__':
@@ -1,7 +1,57 @@
 from .base import BaseIndicator
+import math
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional; SharpeRatio falls back to NumPy reductions
+    NUMBA_AVAILABLE = False
+
+
+def _returns_mean_std(prices: np.ndarray) -> tuple:
+    """
+    Mean and sample standard deviation of the simple returns of `prices`,
+    in a single streaming (Welford) pass that never materializes the returns.
+
+    Missing prices are forward-filled and leading ones skipped, matching
+    `prices.pct_change().dropna()`.
+    """
+    # No returns at all; also keeps the compiled loop from reading prices[0] of an
+    # empty array (numba doesn't bounds-check).
+    if prices.shape[0] < 2:
+        return np.nan, np.nan
+    mean = 0.0
+    m2 = 0.0
+    n = 0
+    previous = prices[0]
+    for i in range(1, prices.shape[0]):
+        current = prices[i]
+        if np.isnan(current):
+            current = previous
+        if not (np.isnan(previous) or np.isnan(current)):
+            r = current / previous - 1.0
+            n += 1
+            delta = r - mean
+            mean += delta / n
+            m2 += delta * (r - mean)
+        previous = current
+    if n < 2:
+        return mean if n else np.nan, np.nan
+    return mean, np.sqrt(m2 / (n - 1))
+
+
+if NUMBA_AVAILABLE:
+    _returns_mean_std = njit(cache=True)(_returns_mean_std)
+
+
+@lru_cache(maxsize=64)
+def _periodic_risk_free_rate(annual_rate: float, periods_per_year: int) -> float:
+    """De-annualizes a risk-free rate to match the period of the returns."""
+    return (1 + annual_rate) ** (1 / periods_per_year) - 1
+
 
 class SharpeRatio(BaseIndicator):
     """
@@ -11,6 +61,9 @@ class SharpeRatio(BaseIndicator):
     (Mean Portfolio Return - Risk-Free Rate) / Standard Deviation of Portfolio Return
     """
 
+    __slots__ = ("_prices", "_returns", "annual_risk_free_rate", "periods_per_year",
+                 "_periodic_risk_free_rate", "_sqrt_periods")
+
     def __init__(self, prices: pd.Series, risk_free_rate: float, periods_per_year: int = 252):
         """
         Initializes the SharpeRatio indicator.
@@ -26,10 +79,28 @@ class SharpeRatio(BaseIndicator):
         """
         super().__init__()
 
-        self.portfolio_returns = np.array(prices.pct_change().dropna())
+        self._prices = np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+        self._returns = None
         self.annual_risk_free_rate = risk_free_rate
         self.periods_per_year = periods_per_year
-        
+        # Only depend on the constructor arguments, so they are computed once here.
+        self._periodic_risk_free_rate = _periodic_risk_free_rate(risk_free_rate, periods_per_year)
+        self._sqrt_periods = math.sqrt(periods_per_year)
+
+    @property
+    def portfolio_returns(self) -> np.ndarray:
+        """
+        Periodic returns of the prices, computed on first access and then reused.
+        Equivalent to `prices.pct_change().dropna()`.
+        """
+        if self._returns is None:
+            prices = self._prices
+            if np.isnan(prices).any():
+                # Only gaps need pandas: forward-fill them and drop the leading ones.
+                prices = pd.Series(prices).ffill().dropna().to_numpy()
+            self._returns = prices[1:] / prices[:-1] - 1.0
+        return self._returns
+
     def calculate(self) -> float:
         """
         Calculates the annualized Sharpe Ratio.
@@ -38,28 +109,27 @@ class SharpeRatio(BaseIndicator):
             float: The calculated annualized Sharpe Ratio. Returns 0.0 if the
                    standard deviation of returns is zero.
         """
-        # Calculate the standard deviation of the portfolio returns.
-        # This represents the portfolio's volatility.
-        portfolio_std_dev = np.std(self.portfolio_returns, ddof=1) # Using sample standard deviation
+        # Calculate the mean and (sample) standard deviation of the portfolio returns.
+        # The standard deviation represents the portfolio's volatility.
+        if NUMBA_AVAILABLE:
+            mean_portfolio_return, portfolio_std_dev = _returns_mean_std(self._prices)
+        else:
+            # Accumulate in float64 so float32 inputs don't lose precision.
+            mean_portfolio_return = np.mean(self.portfolio_returns, dtype=np.float64)
+            portfolio_std_dev = np.std(self.portfolio_returns, ddof=1, dtype=np.float64) # Using sample standard deviation
 
         # If there is no volatility, the Sharpe Ratio is not well-defined.
         # We can return 0.0 or handle it as an exceptional case.
         if portfolio_std_dev == 0:
             return 0.0
 
-        # Calculate the average return for the period.
-        mean_portfolio_return = np.mean(self.portfolio_returns)
-
-        # De-annualize the risk-free rate to match the period of the returns.
-        periodic_risk_free_rate = (1 + self.annual_risk_free_rate)**(1/self.periods_per_year) - 1
-
-        # Calculate the excess return over the risk-free rate for the period.
-        excess_return = mean_portfolio_return - periodic_risk_free_rate
+        # Calculate the excess return over the (de-annualized) risk-free rate for the period.
+        excess_return = mean_portfolio_return - self._periodic_risk_free_rate
 
         # Calculate the Sharpe Ratio for the period.
         periodic_sharpe_ratio = excess_return / portfolio_std_dev
 
         # Annualize the Sharpe Ratio by multiplying by the square root of the number of periods.
-        annualized_sharpe_ratio = periodic_sharpe_ratio * np.sqrt(self.periods_per_year)
+        annualized_sharpe_ratio = periodic_sharpe_ratio * self._sqrt_periods
 
         return annualized_sharpe_ratio
@@ -3,6 +3,8 @@ from .base import BaseIndicator
 
 
 class MonteCarloVaR(BaseIndicator):
+    __slots__ = ("simulated_returns", "current_variables", "previous_variables", "confidence_level")
+
     def __init__(self, simulated_returns, current_variables, previous_variables, confidence_level=0.95):
         super().__init__()
         self.simulated_returns = simulated_returns
@@ -1,13 +1,16 @@
 import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
-from itertools import combinations
-from statsmodels.regression.linear_model import OLS
-from statsmodels.tools.tools import add_constant
 from statsmodels.tsa.stattools import adfuller
+from statsmodels.tsa.adfvalues import mackinnonp
 import matplotlib.pyplot as plt
 import os
+import sys
 import time
+import queue
+import logging
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 # === CONFIGURACIÓN ===
 symbols = [
@@ -37,43 +40,213 @@ symbols = [
 ]
 n_candles = 1000
 lot = 0.1
+fetch_workers = 8  # descargas simultáneas de velas al terminal
+# Prefiltro de cointegración: con raíz unitaria n·DW del spread se queda en unas
+# pocas unidades (≈ 4·t² del test DF), así que por debajo de este valor no se llama a adfuller
+min_crdw = 4.0
+# Correlación mínima (en valor absoluto) entre los precios de un par para estudiarlo
+min_abs_corr = 0.7
+# p-valor del ADF rápido (un solo rezago) por debajo del cual se repite el ADF completo
+adf_prescreen_pvalue = 0.3
+adf_workers = os.cpu_count() or 1  # procesos para los tests ADF de los pares candidatos
+
+log = logging.getLogger("stratarb")
+_log_listener = None
 
 # === FUNCIONES ===
 
-def init_mt5():
+def init_logging():
+    # Los hilos solo encolan los registros; un único hilo los escribe en consola,
+    # así ningún hilo de descarga u órdenes se bloquea esperando a stdout.
+    global _log_listener
+    if _log_listener is not None:
+        # Ya iniciado: otro QueueHandler duplicaría cada línea y otro listener quedaría colgado
+        return
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = logging.handlers.QueueListener(log_queue, console)
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    _log_listener.start()
+
+def stop_logging():
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+        for handler in log.handlers[:]:
+            if isinstance(handler, logging.handlers.QueueHandler):
+                log.removeHandler(handler)
+
+def init_mt5(symbols=()):
+    init_logging()
     if not mt5.initialize():
-        print("MT5 no se pudo iniciar:", mt5.last_error())
+        log.error("MT5 no se pudo iniciar: %s", mt5.last_error())
+        stop_logging()
         quit()
+    # Selección de todos los símbolos una sola vez por sesión
+    select_symbols(symbols)
 
 def shutdown_mt5():
     mt5.shutdown()
+    stop_logging()
+
+# Símbolos ya seleccionados en Market Watch durante esta sesión
+_selected_symbols = set()
 
-def fetch_price_data(symbols, n_candles):
-    symbol_data = {}
+def select_symbols(symbols):
+    # Solo llama a symbol_select para los símbolos que aún no están seleccionados;
+    # devuelve False si alguno no se pudo seleccionar
+    all_selected = True
     for symbol in symbols:
-        print("importando", symbol)
-        mt5.symbol_select(symbol, True)
-        rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_D1, 0, n_candles)
-        if rates is not None and len(rates) > 0:
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            symbol_data[symbol] = df['close']
+        if symbol in _selected_symbols:
+            continue
+        if mt5.symbol_select(symbol, True):
+            _selected_symbols.add(symbol)
         else:
-            print(f"⚠️ No se pudo obtener datos de {symbol}")
-    return symbol_data
+            all_selected = False
+    return all_selected
+
+def fetch_symbol_data(symbol, n_candles):
+    log.info("importando %s", symbol)
+    rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_D1, 0, n_candles)
+    if rates is not None and len(rates) > 0:
+        # `rates` ya es un array estructurado de NumPy: se toman directamente los campos
+        # time y close, sin construir un DataFrame con todas las columnas
+        index = pd.to_datetime(rates['time'], unit='s').rename('time')
+        return pd.Series(rates['close'], index=index, name='close')
+    log.warning("⚠️ No se pudo obtener datos de %s", symbol)
+    return None
+
+def fetch_price_data(symbols, n_candles, max_workers=fetch_workers):
+    # Cada descarga es una llamada bloqueante al terminal; con varios hilos
+    # las esperas se solapan en lugar de sumarse símbolo por símbolo.
+    # Se seleccionan aquí también (solo llama a symbol_select para los que aún no lo
+    # están), por si quien llama no los pasó a init_mt5; los que no se pudieron
+    # seleccionar no tienen velas: no se piden.
+    select_symbols(symbols)
+    missing = [symbol for symbol in symbols if symbol not in _selected_symbols]
+    if missing:
+        log.warning("⚠️ Símbolos no disponibles: %s", ", ".join(missing))
+        symbols = [symbol for symbol in symbols if symbol in _selected_symbols]
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_symbol_data, symbol, n_candles): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            close = future.result()
+            if close is not None:
+                fetched[futures[future]] = close
+    # Conservar el orden de `symbols`: define la orientación (y, x) de cada par
+    return {symbol: fetched[symbol] for symbol in symbols if symbol in fetched}
+
+def pair_moments(values, center=True):
+    """
+    Sumas por pares de columnas de `values` (NaN donde no hay dato), usando
+    solo las filas en que ambas columnas tienen dato.
+    Devuelve (n, sum_x, sum_y, sum_xx, sum_yy, sum_xy), matrices K×K donde
+    y es la columna i y x la columna j. Con `center` cada columna se centra
+    antes en su media, lo que no cambia pendientes ni varianzas y reduce la
+    cancelación numérica.
+    """
+    valid = ~np.isnan(values)
+    mask = valid.astype(np.float64)
+    centered = np.where(valid, values - np.nanmean(values, axis=0) if center else values, 0.0)
+
+    n = mask.T @ mask                   # n[i, j]: fechas comunes
+    sum_x = mask.T @ centered           # suma de x_j donde ambos tienen dato
+    sum_xx = mask.T @ (centered ** 2)
+    sum_xy = centered.T @ centered
+    return n, sum_x, sum_x.T, sum_xx, sum_xx.T, sum_xy
+
+def hedge_ratio_matrix(values, moments=None):
+    """
+    Pendiente OLS (y = a + b·x) de todos los pares a la vez.
 
-def test_cointegration(sym1, sym2, s1, s2):
-    df_pair = pd.concat([s1, s2], axis=1, join='inner').dropna()
-    df_pair.columns = ['y', 'x']
-    if len(df_pair) < 200:
+    `values` tiene un símbolo por columna y NaN donde el símbolo no cotizó.
+    Cada par usa solo las fechas en que ambos tienen dato (igual que el
+    `join='inner'` por par), pero los momentos se obtienen con unos pocos
+    productos matriciales en lugar de una regresión por par.
+    `moments` permite pasar pair_moments(values) ya calculado.
+    Devuelve `beta` con beta[i, j] = pendiente de la columna i sobre la j.
+    """
+    n, sum_x, sum_y, sum_xx, _, sum_xy = pair_moments(values) if moments is None else moments
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2)
+
+def correlation_matrix(values, moments=None):
+    """
+    Correlación de Pearson de todos los pares a la vez, cada par sobre sus
+    fechas comunes (a diferencia de np.corrcoef, que exige filas completas).
+    """
+    n, sum_x, sum_y, sum_xx, sum_yy, sum_xy = pair_moments(values) if moments is None else moments
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (n * sum_xy - sum_x * sum_y) / np.sqrt((n * sum_xx - sum_x ** 2) * (n * sum_yy - sum_y ** 2))
+
+def durbin_watson_matrix(values, beta, moments=None):
+    """
+    Estadístico de Durbin-Watson del spread y_i - beta[i, j]·x_j de todos los pares.
+
+    Como en `hedge_ratio_matrix`, cada par usa sus fechas comunes (y las
+    diferencias, solo entre velas consecutivas con dato de ambos) y todo se
+    obtiene con productos matriciales. Con raíz unitaria el DW del spread
+    tiende a 0, así que sirve de prefiltro barato antes de `adfuller`.
+    Devuelve (n, dw): fechas comunes y DW de cada par.
+    """
+    n, sum_x, sum_y, sum_xx, sum_yy, sum_xy = pair_moments(values) if moments is None else moments
+    # Las diferencias no se centran: el DW usa Σ(Δs)² tal cual
+    _, _, _, dsum_xx, dsum_yy, dsum_xy = pair_moments(np.diff(values, axis=0), center=False)
+
+    # Σ(s - s̄)² y Σ(Δs)² del spread s = y - b·x a partir de los momentos de x e y
+    sum_s = sum_y - beta * sum_x
+    sum_ss = sum_yy - 2 * beta * sum_xy + beta ** 2 * sum_xx
+    sum_dss = dsum_yy - 2 * beta * dsum_xy + beta ** 2 * dsum_xx
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return n, sum_dss / (sum_ss - sum_s ** 2 / n)
+
+def adf_quick_pvalue(spread):
+    """
+    p-valor del ADF con constante y un solo rezago, igual que
+    adfuller(spread, maxlag=1, regression='c', autolag=None)[1].
+
+    La regresión Δs_t = c + γ·s_{t-1} + δ·Δs_{t-1} se resuelve en forma cerrada:
+    tras restar las medias (lo que absorbe la constante) quedan las ecuaciones
+    normales 2×2, sin pasar por el OLS genérico de statsmodels.
+    """
+    diff = np.diff(spread)
+    level = spread[1:-1] - spread[1:-1].mean()      # s_{t-1}
+    lagged = diff[:-1] - diff[:-1].mean()           # Δs_{t-1}
+    target = diff[1:] - diff[1:].mean()             # Δs_t
+
+    s11 = level @ level
+    s22 = lagged @ lagged
+    s12 = level @ lagged
+    s1y = level @ target
+    s2y = lagged @ target
+    det = s11 * s22 - s12 * s12
+
+    gamma = (s22 * s1y - s12 * s2y) / det
+    delta = (s11 * s2y - s12 * s1y) / det
+    residuals = target - gamma * level - delta * lagged
+    sigma2 = (residuals @ residuals) / (len(target) - 3)
+    tstat = gamma / np.sqrt(sigma2 * s22 / det)
+    return mackinnonp(tstat, regression='c', N=1)
+
+def test_cointegration(sym1, sym2, y, x, hedge_ratio):
+    # `y` y `x` ya vienen alineados: solo las fechas en que ambos símbolos tienen dato
+    if len(y) < 200:
         return None
 
-    X = add_constant(df_pair['x'])
-    model = OLS(df_pair['y'], X).fit()
-    hedge_ratio = model.params['x']
-    spread = df_pair['y'] - hedge_ratio * df_pair['x']
-    adf_pvalue = adfuller(spread)[1]
+    spread = y - hedge_ratio * x
+    # ADF rápido con un rezago fijo (una regresión en forma cerrada); el ADF completo, que
+    # ajusta una regresión por rezago para elegirlo por AIC, solo para los pares que lo superan
+    adf_pvalue = adf_quick_pvalue(spread)
+    if adf_pvalue < adf_prescreen_pvalue:
+        adf_pvalue = adfuller(spread)[1]
 
     if adf_pvalue < 0.05:
         return {
@@ -84,122 +257,272 @@ def test_cointegration(sym1, sym2, s1, s2):
             'spread': spread
         }
     return None
-def get_valid_volume(symbol, desired_volume):
-    info = mt5.symbol_info(symbol)
+# La información de cada símbolo no cambia durante la sesión; los ticks sí,
+# por eso su caché se vacía al inicio de cada operación.
+_symbol_info_cache = {}
+_volume_limits_cache = {}
+_tick_cache = {}
+
+def get_symbol_info(symbol):
+    info = _symbol_info_cache.get(symbol)
     if info is None:
-        print(f"❌ No se pudo obtener información del símbolo {symbol}")
-        return None
+        info = mt5.symbol_info(symbol)
+        if info is not None:
+            _symbol_info_cache[symbol] = info
+    return info
+
+def get_symbol_tick(symbol):
+    tick = _tick_cache.get(symbol)
+    if tick is None:
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is not None:
+            _tick_cache[symbol] = tick
+    return tick
+
+def get_volume_limits(symbol):
+    # (mínimo, máximo, step, 1/step): el inverso evita una división por cada cálculo
+    limits = _volume_limits_cache.get(symbol)
+    if limits is None:
+        info = get_symbol_info(symbol)
+        if info is None:
+            return None
+        limits = (info.volume_min, info.volume_max, info.volume_step, 1.0 / info.volume_step)
+        _volume_limits_cache[symbol] = limits
+    return limits
 
-    min_vol = info.volume_min
-    max_vol = info.volume_max
-    step = info.volume_step
+def get_valid_volume(symbol, desired_volume):
+    limits = get_volume_limits(symbol)
+    if limits is None:
+        log.error("❌ No se pudo obtener información del símbolo %s", symbol)
+        return None
 
-    # Asegurar que el volumen esté en rango
-    volume = max(min_vol, desired_volume)
-    volume = min(volume, max_vol)
+    min_vol, max_vol, step, inv_step = limits
 
-    # Redondear al múltiplo de step
-    steps = round(volume / step)
+    # Asegurar que el volumen esté en rango y redondear al múltiplo de step
+    steps = int(min(max(desired_volume, min_vol), max_vol) * inv_step + 0.5)
     valid_volume = round(steps * step, 2)
 
-    print(f"ℹ️ {symbol} - min_vol: {min_vol}, step: {step}, volumen final: {valid_volume}")
+    log.debug("ℹ️ %s - min_vol: %s, step: %s, volumen final: %s", symbol, min_vol, step, valid_volume)
     return valid_volume
 
+# Rechazos transitorios: el precio se movió mientras la orden iba al servidor
+RETRY_RETCODES = (mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_OFF)
+
+def with_current_price(order):
+    # Copia de la orden con el precio del último tick (ask para compras, bid para ventas)
+    tick = mt5.symbol_info_tick(order["symbol"])
+    if tick is None:
+        return order
+    return {**order, "price": tick.ask if order["type"] == mt5.ORDER_TYPE_BUY else tick.bid}
+
+def send_order(order, retries=3):
+    symbol = order["symbol"]
+    # Ante una recotización se reintenta con el precio actual, esperando 10 ms, 20 ms, 40 ms...
+    delay = 0.01
+    result = mt5.order_send(order)
+    for _ in range(retries):
+        if result is None or result.retcode not in RETRY_RETCODES:
+            break
+        log.warning("🔁 Orden %s recotizada (código %s); reintento en %.0f ms", symbol, result.retcode, delay * 1000)
+        time.sleep(delay)
+        delay *= 2
+        order = with_current_price(order)
+        result = mt5.order_send(order)
+    if result is None:
+        log.error("❌ Error al enviar orden para %s. Retorno vacío.", symbol)
+        return None
+    elif result.retcode != mt5.TRADE_RETCODE_DONE:
+        log.error("❌ Orden %s fallida. Código: %s", symbol, result.retcode)
+        return None
+    log.info("✅ Orden %s enviada correctamente.", symbol)
+    return result
+
+def deal_position_ticket(result):
+    # Ticket de la posición en la que quedó el deal de la orden (None si aún no figura).
+    # El filtro ticket= de history_deals_get es el ticket de la orden, no el del deal.
+    for deal in mt5.history_deals_get(ticket=result.order) or ():
+        if deal.ticket == result.deal:
+            return deal.position_id
+    return None
+
+def wait_for_positions(results, timeout=5.0):
+    """
+    Sondea las posiciones abiertas hasta que aparezca la de cada resultado.
+    Devuelve, por pierna, el ticket de su posición (None si no apareció a tiempo).
+
+    La posición se localiza por el deal de la pierna y no por result.order: en una
+    cuenta netting el deal se suma a la posición que ya hubiera en el símbolo,
+    que conserva su propio ticket.
+    """
+    tickets = [None] * len(results)
+    delay = 0.02
+    deadline = time.monotonic() + timeout
+    while True:
+        # Una sola consulta de posiciones por vuelta para todas las piernas pendientes
+        open_tickets = {position.ticket for position in mt5.positions_get() or ()}
+        for k, result in enumerate(results):
+            if tickets[k] is None:
+                ticket = deal_position_ticket(result)
+                if ticket in open_tickets:
+                    tickets[k] = ticket
+        if all(ticket is not None for ticket in tickets) or time.monotonic() >= deadline:
+            return tickets
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+
+def close_leg(order, result, ticket=None, timeout=1.0):
+    """
+    Deshace la pierna abierta por `order` (p. ej. cuando la otra pierna falló) con
+    una orden opuesta por el volumen de su deal. En una cuenta netting la posición
+    `ticket` puede incluir volumen previo al spread, que así no se toca.
+
+    Sin ticket, la posición se busca durante `timeout` segundos; si no aparece, la
+    orden opuesta se envía solo por símbolo y volumen para no dejar la exposición.
+    """
+    symbol = order["symbol"]
+    if ticket is None:
+        ticket = wait_for_positions((result,), timeout)[0]
+    tick = mt5.symbol_info_tick(symbol)
+    if tick is None:
+        log.error("❌ Sin tick de %s; la pierna queda abierta.", symbol)
+        return
+    is_buy = order["type"] == mt5.ORDER_TYPE_BUY
+    request = {
+        **order,
+        "type": mt5.ORDER_TYPE_SELL if is_buy else mt5.ORDER_TYPE_BUY,
+        "price": tick.bid if is_buy else tick.ask,
+        "volume": result.volume,
+        "comment": "Cierre Spread",
+    }
+    if ticket is None:
+        log.warning("↩️ Cerrando pierna %s por símbolo y volumen (posición no encontrada)", symbol)
+    else:
+        positions = mt5.positions_get(symbol=symbol) or ()
+        position = next((position for position in positions if position.ticket == ticket), None)
+        if position is None:
+            log.error("❌ La posición %s de la pierna %s ya no está abierta.", ticket, symbol)
+            return
+        log.warning("↩️ Cerrando pierna %s (ticket %s)", symbol, ticket)
+        request["volume"] = min(result.volume, position.volume)
+        request["position"] = ticket
+    send_order(request)
+
+# Campos comunes a todas las órdenes de entrada del spread
+ORDER_TEMPLATE = {
+    "action": mt5.TRADE_ACTION_DEAL,
+    "deviation": 20,
+    "magic": 123456,
+    "comment": "Entrada Spread",
+    "type_time": mt5.ORDER_TIME_GTC,
+    "type_filling": mt5.ORDER_FILLING_FOK
+}
+
 def place_trade(sym1, sym2, hedge_ratio, direction, entry_spread, mean, std, lot=0.1):
     """
     direction: 1 = long spread, -1 = short spread
     """
-    print(f"📡 Enviando órdenes MT5: {'LONG' if direction == 1 else 'SHORT'} spread {sym1} - {sym2}...")
+    log.info("📡 Enviando órdenes MT5: %s spread %s - %s...", 'LONG' if direction == 1 else 'SHORT', sym1, sym2)
+    _tick_cache.clear()
     lot1 = get_valid_volume(sym1, 0.1)
     lot2 = get_valid_volume(sym2, abs(hedge_ratio) * lot1)
 
     # Selección de símbolos
-    if not mt5.symbol_select(sym1, True) or not mt5.symbol_select(sym2, True):
-        print(f"❌ No se pudo seleccionar uno de los símbolos: {sym1}, {sym2}")
+    if not select_symbols((sym1, sym2)):
+        log.error("❌ No se pudo seleccionar uno de los símbolos: %s, %s", sym1, sym2)
         return
 
-    price1 = mt5.symbol_info_tick(sym1).ask if direction == 1 else mt5.symbol_info_tick(sym1).bid
-    price2 = mt5.symbol_info_tick(sym2).bid if direction == 1 else mt5.symbol_info_tick(sym2).ask
+    tick1 = get_symbol_tick(sym1)
+    tick2 = get_symbol_tick(sym2)
+    price1 = tick1.ask if direction == 1 else tick1.bid
+    price2 = tick2.bid if direction == 1 else tick2.ask
 
     # Definir el tipo de orden
     type1 = mt5.ORDER_TYPE_BUY if direction == 1 else mt5.ORDER_TYPE_SELL
     type2 = mt5.ORDER_TYPE_SELL if direction == 1 else mt5.ORDER_TYPE_BUY
 
-    # Orden 1
-    order1 = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": sym1,
-        "volume": lot,
-        "type": type1,
-        "price": price1,
-        "deviation": 20,
-        "magic": 123456,
-        "comment": "Entrada Spread",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_FOK
-    }
+    # Orden 1 y Orden 2: solo cambian los campos propios de cada pierna
+    order1 = {**ORDER_TEMPLATE, "symbol": sym1, "volume": lot, "type": type1, "price": price1}
+    order2 = {**ORDER_TEMPLATE, "symbol": sym2, "volume": lot * hedge_ratio, "type": type2, "price": price2}
 
-    result1 = mt5.order_send(order1)
-    if result1 is None:
-        print(f"❌ Error al enviar orden para {sym1}. Retorno vacío.")
-        return
-    elif result1.retcode != mt5.TRADE_RETCODE_DONE:
-        print(f"❌ Orden {sym1} fallida. Código: {result1.retcode}")
-        return
-    else:
-        print(f"✅ Orden {sym1} enviada correctamente.")
-
-    time.sleep(1)  # ligera pausa entre órdenes
-
-    # Orden 2
-    order2 = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": sym2,
-        "volume": lot * hedge_ratio,
-        "type": type2,
-        "price": price2,
-        "deviation": 20,
-        "magic": 123456,
-        "comment": "Entrada Spread",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_FOK
-    }
+    # Ambas piernas se envían a la vez para que el spread no se mueva entre ellas
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result1, result2 = executor.map(send_order, (order1, order2))
 
-    result2 = mt5.order_send(order2)
-    if result2 is None:
-        print(f"❌ Error al enviar orden para {sym2}. Retorno vacío.")
+    if result1 is None or result2 is None:
+        # Si solo una pierna se ejecutó, se cierra para no quedar con exposición direccional
+        if result1 is not None:
+            close_leg(order1, result1)
+        if result2 is not None:
+            close_leg(order2, result2)
         return
-    elif result2.retcode != mt5.TRADE_RETCODE_DONE:
-        print(f"❌ Orden {sym2} fallida. Código: {result2.retcode}")
+
+    # El spread solo queda abierto cuando las dos posiciones aparecen en la cuenta
+    ticket1, ticket2 = wait_for_positions((result1, result2))
+    if ticket1 is None or ticket2 is None:
+        # Ambas órdenes se ejecutaron: se deshacen las dos, por ticket o por símbolo y volumen
+        log.error("❌ Spread %s - %s sin confirmar; se cierran ambas piernas.", sym1, sym2)
+        close_leg(order1, result1, ticket1, timeout=0)
+        close_leg(order2, result2, ticket2, timeout=0)
         return
-    else:
-        print(f"✅ Orden {sym2} enviada correctamente.")
 
     # Mostrar info general
-    print(f"🎯 Spread: {entry_spread:.2f} | TP: {mean:.2f} | SL: {entry_spread + direction * 1.5 * std:.2f}")
+    log.info("🎯 Spread: %.2f | TP: %.2f | SL: %.2f", entry_spread, mean, entry_spread + direction * 1.5 * std)
 
 
 # === EJECUCIÓN PRINCIPAL ===
 
-init_mt5()
-symbol_data = fetch_price_data(symbols, n_candles)
+# Los procesos de los tests ADF importan este módulo al arrancar (en Windows no hay
+# fork): sin este guard cada uno volvería a conectarse a MT5 y a descargar los datos
+if __name__ == "__main__":
+    init_mt5(symbols)
+    symbol_data = fetch_price_data(symbols, n_candles)
+
+    # Todas las series se alinean una sola vez sobre un índice común (NaN donde un
+    # símbolo no cotizó) y se guardan por símbolo: closes[k] es la serie contigua
+    # del símbolo k, en el orden de symbol_data
+    closes = np.ascontiguousarray(pd.DataFrame(symbol_data).to_numpy(dtype=np.float64).T)
+    valid = ~np.isnan(closes)
+    # Las funciones matriciales esperan un símbolo por columna: closes.T es una vista, sin copia.
+    # Los momentos de todos los pares salen de unos pocos productos matriciales (BLAS)
+    # y se calculan una sola vez para el hedge ratio, la correlación y el Durbin-Watson
+    moments = pair_moments(closes.T)
+    hedge_ratios = hedge_ratio_matrix(closes.T, moments)
+    names = list(symbol_data)
+
+    # Solo llegan a adfuller los pares con historia suficiente, precios bastante
+    # correlacionados y un spread que no parezca un paseo aleatorio según su Durbin-Watson
+    n_obs, dw = durbin_watson_matrix(closes.T, hedge_ratios, moments)
+    correlations = correlation_matrix(closes.T, moments)
+    with np.errstate(invalid='ignore'):
+        candidates = (n_obs >= 200) & (np.abs(correlations) >= min_abs_corr) & (n_obs * dw >= min_crdw)
+
+    # Solo se recorren los pares candidatos (i < j, en el orden de itertools.combinations),
+    # no los C(n, 2) pares para descartar casi todos en Python
+    pair_args = []
+    for i, j in zip(*np.nonzero(np.triu(candidates, k=1))):
+        # Fechas comunes del par: una máscara sobre dos filas contiguas, sin concat por par
+        both = valid[i] & valid[j]
+        pair_args.append((names[i], names[j], closes[i, both], closes[j, both], hedge_ratios[i, j]))
+
+    # Cada test ADF es independiente y consume CPU en Python: se reparten entre procesos
+    # (los hilos no sirven por el GIL). map conserva el orden de los pares.
+    chunksize = max(1, len(pair_args) // (4 * adf_workers))
+    with ProcessPoolExecutor(max_workers=adf_workers) as executor:
+        results = list(executor.map(test_cointegration, *zip(*pair_args), chunksize=chunksize))
+    cointegrated_pairs = [result for result in results if result]
 
-cointegrated_pairs = []
-for sym1, sym2 in combinations(symbol_data.keys(), 2):
-    result = test_cointegration(sym1, sym2, symbol_data[sym1], symbol_data[sym2])
-    if result:
-        cointegrated_pairs.append(result)
+    for result in cointegrated_pairs:
+        sym1, sym2 = result['sym1'], result['sym2']
         spread = result['spread']
         mean = spread.mean()
-        std = spread.std()
-        zscore = (spread - mean) / std
-        current_z = zscore.iloc[-1]
-        spread_entry = spread.iloc[-1]
+        std = spread.std(ddof=1)
+        spread_entry = spread[-1]
+        current_z = (spread_entry - mean) / std
 
-        print(f"✅ {sym1}-{sym2} cointegrados | p={result['pvalue']:.4f} | β={result['hedge_ratio']:.4f} | z={current_z:.2f}")
+        log.info("✅ %s-%s cointegrados | p=%.4f | β=%.4f | z=%.2f", sym1, sym2, result['pvalue'], result['hedge_ratio'], current_z)
 
         if 2 <= abs(current_z) < 3:
             direction = -1 if current_z > 0 else 1
             place_trade(sym1, sym2, result['hedge_ratio'], direction, spread_entry, mean, std)
 
-shutdown_mt5()
\ No newline at end of file
+    shutdown_mt5()
@@ -4,27 +4,68 @@ import yfinance as yf
 import mplfinance as mpf
 import matplotlib.pyplot as plt
 from typing import Dict, Callable
+from functools import lru_cache
 from backtesting import Backtest, Strategy
+from scipy.signal import fftconvolve
+
+from common import njit, NUMBA_AVAILABLE
+
+# Window length from which nwe() switches to an FFT convolution.
+FFT_MIN_LENGTH = 64
+
+
+@lru_cache(maxsize=64)
+def _nwe_weights(length: int, bandwidth: float) -> np.ndarray:
+    """Gaussian kernel weights of the last `length` bars, computed once per (length, bandwidth)."""
+    k = np.arange(length)
+    weights = np.exp(-((k - (length - 1))**2) / (2 * bandwidth**2))
+    weights.flags.writeable = False  # shared between calls through the cache
+    return weights
+
+
+# Only FMA contraction and reassociation of the sum: full fastmath would assume no NaNs.
+@njit(cache=True, fastmath={'contract', 'reassoc'})
+def _nwe_loop(source, w, length, out):
+    """Sliding weighted sum of the previous `length` bars into `out` (compiled with numba when available)."""
+    w_sum = w.sum()
+    for i in range(length, len(source)):
+        acc = 0.0
+        for j in range(length):
+            acc += source[i - length + j] * w[j]
+        out[i] = acc / w_sum
+
 
 def nwe(source: np.ndarray, length: int, bandwidth: float) -> np.ndarray:
     """
     Calculates the Nadaraya-Watson Estimator for a NumPy array.
-    This version is optimized for use with the backtesting.py library.
+    This version is optimized for use with the backtesting.py library:
+    the kernel weights are computed once and applied to every window of the
+    previous `length` bars, by an FFT convolution for long windows, a
+    compiled loop when numba is installed and a direct convolution otherwise.
     """
-    nwe_values = np.full_like(source, np.nan)
-    
-    for i in range(length, len(source)):
-        y_ = source[i - length : i]
-        sum_w, sum_wy = 0.0, 0.0
-        
-        for k in range(length):
-            w = np.exp(-((k - (length - 1))**2) / (2 * bandwidth**2))
-            sum_w += w
-            sum_wy += y_[k] * w
-            
-        if sum_w != 0:
-            nwe_values[i] = sum_wy / sum_w
-            
+    # float32 prices halve the memory traffic; the weighted sums stay in float64.
+    source = np.ascontiguousarray(source, dtype=np.float32)
+    nwe_values = np.full(len(source), np.nan)
+    if len(source) <= length:
+        return nwe_values
+
+    weights = _nwe_weights(length, bandwidth)
+
+    # Long windows: an FFT convolution is O(N log N) instead of O(N * length).
+    # NaNs would smear over the whole FFT output, so gappy series keep the direct sum.
+    if length >= FFT_MIN_LENGTH and np.isfinite(source).all():
+        # float64 input: scipy would otherwise transform the float32 prices in single precision.
+        window_sums = fftconvolve(source.astype(np.float64), weights[::-1], mode='valid')
+        nwe_values[length:] = window_sums[:-1] / weights.sum()
+        return nwe_values
+
+    if NUMBA_AVAILABLE:
+        _nwe_loop(source, weights, length, nwe_values)
+        return nwe_values
+
+    # window_sums[m] = sum(source[m:m + length] * weights), so bar i uses window_sums[i - length]
+    window_sums = np.convolve(source, weights[::-1], mode='valid')
+    nwe_values[length:] = window_sums[:-1] / weights.sum()
     return nwe_values
 
 
@@ -45,7 +86,11 @@ class NWEStrategy(Strategy):
         # Primary Indicators
         self.nwe = self.I(nwe, self.data.Close, length=self.nw_length, bandwidth=self.nw_bandwidth, name="NWE")
         # Logic Indicators (not plotted)
-        self.nwe_direction = self.I(lambda x: np.sign(np.diff(x, prepend=np.nan)), self.nwe, plot=False)
+        # Slope sign of the NWE, computed once here and kept as int8 (1 byte per bar);
+        # the warm-up bars are 0, which next() treats like the NaN they used to be.
+        direction = np.sign(np.diff(np.asarray(self.nwe), prepend=np.nan))
+        direction = np.nan_to_num(direction, nan=0.0).astype(np.int8)
+        self.nwe_direction = self.I(lambda: direction, name="NWE direction", plot=False)
         
         
 
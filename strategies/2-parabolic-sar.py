@@ -3,23 +3,19 @@ import numpy as np
 import yfinance as yf
 from backtesting import Backtest, Strategy
 
+from common import njit
+
 # --- Custom Indicator Function ---
-def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
-    """
-    Custom implementation of the Parabolic SAR (PSAR) indicator.
-    """
-    close = (high + low) / 2 # Use a proxy for close if not available
+@njit(cache=True)
+def _psar_core(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """Parabolic SAR recursion over raw float64 arrays (compiled with numba when available)."""
     length = len(high)
     psar_values = np.zeros(length)
-    psar_bull = np.zeros(length)
-    psar_bear = np.zeros(length)
     bull = True
     af = initial_acceleration
     ep = low[0]
 
     psar_values[0] = high[0]
-    psar_bull[0] = high[0]
-    psar_bear[0] = low[0]
 
     for i in range(2, length):
         if bull:
@@ -45,26 +41,42 @@ def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
                 af = initial_acceleration
 
         if not reverse:
+            # Conditional expressions instead of nested ifs: numba lowers them to
+            # selects, so these data-dependent updates can't be mispredicted.
+            # The comparisons are unchanged, so a NaN bar still leaves everything as is.
             if bull:
-                if high[i] > ep:
-                    ep = high[i]
-                    af = min(af + acceleration_step, max_acceleration)
-                if low[i - 1] < psar_values[i]:
-                    psar_values[i] = low[i - 1]
-                if low[i - 2] < psar_values[i]:
-                    psar_values[i] = low[i - 2]
+                new_ep = high[i] > ep
+                ep = high[i] if new_ep else ep
+                af = min(af + acceleration_step, max_acceleration) if new_ep else af
+                sar = psar_values[i]
+                sar = low[i - 1] if low[i - 1] < sar else sar
+                psar_values[i] = low[i - 2] if low[i - 2] < sar else sar
             else:
-                if low[i] < ep:
-                    ep = low[i]
-                    af = min(af + acceleration_step, max_acceleration)
-                if high[i - 1] > psar_values[i]:
-                    psar_values[i] = high[i - 1]
-                if high[i - 2] > psar_values[i]:
-                    psar_values[i] = high[i - 2]
+                new_ep = low[i] < ep
+                ep = low[i] if new_ep else ep
+                af = min(af + acceleration_step, max_acceleration) if new_ep else af
+                sar = psar_values[i]
+                sar = high[i - 1] if high[i - 1] > sar else sar
+                psar_values[i] = high[i - 2] if high[i - 2] > sar else sar
     
-    # Replace zeros with NaNs for cleaner plotting
-    psar_values[psar_values == 0] = np.nan
+    # The second bar is never computed; leave it empty for cleaner plotting
+    if length > 1:
+        psar_values[1] = np.nan
     return psar_values
+
+
+def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """
+    Custom implementation of the Parabolic SAR (PSAR) indicator.
+    """
+    # Contiguous float64 prices and float parameters, so the kernel compiles only once.
+    return _psar_core(
+        np.ascontiguousarray(high, dtype=np.float64),
+        np.ascontiguousarray(low, dtype=np.float64),
+        float(initial_acceleration),
+        float(max_acceleration),
+        float(acceleration_step),
+    )
   
   
   
@@ -87,11 +99,16 @@ class ParabolicSARStrategy(Strategy):
         """
         This method is called once at the beginning to calculate indicators.
         """
+        # Flat, contiguous float64 price arrays, prepared once here so the compiled
+        # indicators get raw buffers instead of backtesting.py's column wrappers.
+        high = np.ascontiguousarray(self.data.High, dtype=np.float64)
+        low = np.ascontiguousarray(self.data.Low, dtype=np.float64)
+
         # Calculate the Parabolic SAR using our custom function.
         self.psar = self.I(
             psar,
-            self.data.High,
-            self.data.Low,
+            high,
+            low,
             self.initial_acceleration,
             self.max_acceleration,
             self.acceleration_step,
@@ -122,6 +139,43 @@ class ParabolicSARStrategy(Strategy):
                 self.position.close()
             self.sell()
 
+
+def two_stage_optimize(bt: Backtest, coarse_grid: dict, fine_resolution: dict, **kwargs) -> pd.Series:
+    """
+    Coarse-to-fine parameter search.
+    Runs bt.optimize() over `coarse_grid` first, then again over a grid with
+    the steps given in `fine_resolution`, kept strictly within one coarse step
+    of the winning point (the neighbouring coarse values were already tested).
+    Parameters without a fine resolution stay at their best coarse value.
+    Any other keyword arguments (maximize, constraint, ...) go to both searches.
+    """
+    best = bt.optimize(**coarse_grid, **kwargs)._strategy
+
+    fine_grid = {}
+    for name, values in coarse_grid.items():
+        center = getattr(best, name)
+        step = fine_resolution.get(name)
+        if step is None or len(values) < 2:
+            fine_grid[name] = [center]
+            continue
+
+        # Rounded so that np.arange noise (0.30000000000000004) can't widen the bounds.
+        values = np.round(np.sort(values), 10)
+        center_r = np.round(center, 10)
+        i = int(np.argmin(np.abs(values - center_r)))
+        low = values[i - 1] if i > 0 else center_r
+        high = values[i + 1] if i < len(values) - 1 else center_r
+        n = int(np.ceil(max(center_r - low, high - center_r) / step))
+        candidates = np.round(center_r + step * np.arange(-n, n + 1), 10)
+        keep = ((candidates > low) & (candidates < high)) | (candidates == center_r)
+        candidates = candidates[keep]
+        if isinstance(center, (int, np.integer)) and float(step).is_integer():
+            candidates = candidates.astype(int)
+        fine_grid[name] = candidates.tolist()
+
+    return bt.optimize(**fine_grid, **kwargs)
+
+
 # --- Example Usage ---
 if __name__ == '__main__':
     # --- Download Data ---
@@ -136,11 +190,20 @@ if __name__ == '__main__':
     bt = Backtest(data, ParabolicSARStrategy, cash=100_000, commission=.001)
     
     print("\n--- Running Parameter Optimization ---")
-    # Define the parameter grid for the optimizer to test.
-    stats = bt.optimize(
-        initial_acceleration=list(np.arange(0.01, 0.05, 0.01)),
-        max_acceleration=list(np.arange(0.1, 0.4, 0.05)),
-        acceleration_step=list(np.arange(0.01, 0.05, 0.01)),
+    # Search a coarse grid first, then refine around its best point at the
+    # original resolution (0.01 for the accelerations, 0.05 for the maximum).
+    stats = two_stage_optimize(
+        bt,
+        coarse_grid=dict(
+            initial_acceleration=list(np.arange(0.01, 0.06, 0.02)),
+            max_acceleration=list(np.arange(0.1, 0.4, 0.1)),
+            acceleration_step=list(np.arange(0.01, 0.06, 0.02)),
+        ),
+        fine_resolution=dict(
+            initial_acceleration=0.01,
+            max_acceleration=0.05,
+            acceleration_step=0.01,
+        ),
         maximize='Sharpe Ratio',
         constraint=lambda p: p.initial_acceleration < p.max_acceleration # A necessary PSAR constraint
     )
@@ -1,25 +1,24 @@
 import pandas as pd
 import numpy as np
 import yfinance as yf
+from functools import lru_cache
 from backtesting import Backtest, Strategy
+from scipy.signal import fftconvolve
+
+from common import njit, NUMBA_AVAILABLE, cached_indicator
+
 
 # --- Custom Indicator Function ---
-def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
-    """
-    Custom implementation of the Parabolic SAR (PSAR) indicator.
-    """
-    close = (high + low) / 2 # Use a proxy for close if not available
+@njit(cache=True)
+def _psar_core(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """Parabolic SAR recursion over raw float64 arrays (compiled with numba when available)."""
     length = len(high)
     psar_values = np.zeros(length)
-    psar_bull = np.zeros(length)
-    psar_bear = np.zeros(length)
     bull = True
     af = initial_acceleration
     ep = low[0]
 
     psar_values[0] = high[0]
-    psar_bull[0] = high[0]
-    psar_bear[0] = low[0]
 
     for i in range(2, length):
         if bull:
@@ -45,48 +44,106 @@ def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
                 af = initial_acceleration
 
         if not reverse:
+            # Conditional expressions instead of nested ifs: numba lowers them to
+            # selects, so these data-dependent updates can't be mispredicted.
+            # The comparisons are unchanged, so a NaN bar still leaves everything as is.
             if bull:
-                if high[i] > ep:
-                    ep = high[i]
-                    af = min(af + acceleration_step, max_acceleration)
-                if low[i - 1] < psar_values[i]:
-                    psar_values[i] = low[i - 1]
-                if low[i - 2] < psar_values[i]:
-                    psar_values[i] = low[i - 2]
+                new_ep = high[i] > ep
+                ep = high[i] if new_ep else ep
+                af = min(af + acceleration_step, max_acceleration) if new_ep else af
+                sar = psar_values[i]
+                sar = low[i - 1] if low[i - 1] < sar else sar
+                psar_values[i] = low[i - 2] if low[i - 2] < sar else sar
             else:
-                if low[i] < ep:
-                    ep = low[i]
-                    af = min(af + acceleration_step, max_acceleration)
-                if high[i - 1] > psar_values[i]:
-                    psar_values[i] = high[i - 1]
-                if high[i - 2] > psar_values[i]:
-                    psar_values[i] = high[i - 2]
+                new_ep = low[i] < ep
+                ep = low[i] if new_ep else ep
+                af = min(af + acceleration_step, max_acceleration) if new_ep else af
+                sar = psar_values[i]
+                sar = high[i - 1] if high[i - 1] > sar else sar
+                psar_values[i] = high[i - 2] if high[i - 2] > sar else sar
     
-    # Replace zeros with NaNs for cleaner plotting
-    psar_values[psar_values == 0] = np.nan
+    # The second bar is never computed; leave it empty for cleaner plotting
+    if length > 1:
+        psar_values[1] = np.nan
     return psar_values
+
+
+def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """
+    Custom implementation of the Parabolic SAR (PSAR) indicator.
+    """
+    # Contiguous float64 prices and float parameters, so the kernel compiles only once.
+    return cached_indicator(
+        "psar",
+        _psar_core,
+        (np.ascontiguousarray(high, dtype=np.float64), np.ascontiguousarray(low, dtype=np.float64)),
+        (float(initial_acceleration), float(max_acceleration), float(acceleration_step)),
+    )
   
   
 
+# Window length from which nwe() switches to an FFT convolution.
+FFT_MIN_LENGTH = 64
+
+
+@lru_cache(maxsize=64)
+def _nwe_weights(length: int, bandwidth: float) -> np.ndarray:
+    """Gaussian kernel weights of the last `length` bars, computed once per (length, bandwidth)."""
+    k = np.arange(length)
+    weights = np.exp(-((k - (length - 1))**2) / (2 * bandwidth**2))
+    weights.flags.writeable = False  # shared between calls through the cache
+    return weights
+
+
+# Only FMA contraction and reassociation of the sum: full fastmath would assume no NaNs.
+@njit(cache=True, fastmath={'contract', 'reassoc'})
+def _nwe_loop(source, w, length, out):
+    """Sliding weighted sum of the previous `length` bars into `out` (compiled with numba when available)."""
+    w_sum = w.sum()
+    for i in range(length, len(source)):
+        acc = 0.0
+        for j in range(length):
+            acc += source[i - length + j] * w[j]
+        out[i] = acc / w_sum
+
+
 def nwe(source: np.ndarray, length: int, bandwidth: float) -> np.ndarray:
     """
     Calculates the Nadaraya-Watson Estimator for a NumPy array.
-    This version is optimized for use with the backtesting.py library.
+    This version is optimized for use with the backtesting.py library:
+    the kernel weights are computed once and applied to every window of the
+    previous `length` bars, by an FFT convolution for long windows, a
+    compiled loop when numba is installed and a direct convolution otherwise.
+    Results are cached per (source, length, bandwidth).
     """
-    nwe_values = np.full_like(source, np.nan)
-    
-    for i in range(length, len(source)):
-        y_ = source[i - length : i]
-        sum_w, sum_wy = 0.0, 0.0
-        
-        for k in range(length):
-            w = np.exp(-((k - (length - 1))**2) / (2 * bandwidth**2))
-            sum_w += w
-            sum_wy += y_[k] * w
-            
-        if sum_w != 0:
-            nwe_values[i] = sum_wy / sum_w
-            
+    # float32 prices halve the memory traffic; the weighted sums stay in float64.
+    source = np.ascontiguousarray(source, dtype=np.float32)
+    return cached_indicator("nwe", _nwe, (source,), (length, bandwidth))
+
+
+def _nwe(source: np.ndarray, length: int, bandwidth: float) -> np.ndarray:
+    """Uncached Nadaraya-Watson Estimator over a contiguous float32 array."""
+    nwe_values = np.full(len(source), np.nan)
+    if len(source) <= length:
+        return nwe_values
+
+    weights = _nwe_weights(length, bandwidth)
+
+    # Long windows: an FFT convolution is O(N log N) instead of O(N * length).
+    # NaNs would smear over the whole FFT output, so gappy series keep the direct sum.
+    if length >= FFT_MIN_LENGTH and np.isfinite(source).all():
+        # float64 input: scipy would otherwise transform the float32 prices in single precision.
+        window_sums = fftconvolve(source.astype(np.float64), weights[::-1], mode='valid')
+        nwe_values[length:] = window_sums[:-1] / weights.sum()
+        return nwe_values
+
+    if NUMBA_AVAILABLE:
+        _nwe_loop(source, weights, length, nwe_values)
+        return nwe_values
+
+    # window_sums[m] = sum(source[m:m + length] * weights), so bar i uses window_sums[i - length]
+    window_sums = np.convolve(source, weights[::-1], mode='valid')
+    nwe_values[length:] = window_sums[:-1] / weights.sum()
     return nwe_values
 
 
@@ -110,11 +167,18 @@ class NWEPSARStrategy(Strategy):
         """
         This method is called once at the beginning to calculate indicators.
         """
+        # Flat, contiguous price arrays, prepared once here so the compiled
+        # indicators get raw buffers instead of backtesting.py's column wrappers.
+        # The PSAR keeps float64 highs/lows; only the NWE closes are float32.
+        high = np.ascontiguousarray(self.data.High, dtype=np.float64)
+        low = np.ascontiguousarray(self.data.Low, dtype=np.float64)
+        close = np.ascontiguousarray(self.data.Close, dtype=np.float32)
+
         # Calculate the Parabolic SAR using our custom function.
         self.psar = self.I(
             psar,
-            self.data.High,
-            self.data.Low,
+            high,
+            low,
             self.initial_acceleration,
             self.max_acceleration,
             self.acceleration_step,
@@ -122,7 +186,7 @@ class NWEPSARStrategy(Strategy):
         )
         
         # Primary Indicators
-        self.nwe = self.I(nwe, self.data.Close, length=self.nw_length, bandwidth=self.nw_bandwidth, name="NWE")
+        self.nwe = self.I(nwe, close, length=self.nw_length, bandwidth=self.nw_bandwidth, name="NWE")
         # Logic Indicators (not plotted)
         self.nwe_direction = self.I(lambda x: np.sign(np.diff(x, prepend=np.nan)), self.nwe, plot=False)
 
@@ -181,13 +245,18 @@ if __name__ == '__main__':
     bt.plot()
 
     
+    # Model-based search (needs `pip install sambo`) instead of the ~5,400-point grid:
+    # each parameter is a continuous [low, high] range and only max_tries backtests run.
     # stats = bt.optimize(
-    #     initial_acceleration=list(np.arange(0.01, 0.05, 0.01)),
-    #     max_acceleration=list(np.arange(0.1, 0.4, 0.05)),
-    #     acceleration_step=list(np.arange(0.01, 0.05, 0.01)),
-    #     nw_length=range(40, 101, 10),
-    #     nw_bandwidth=list(np.arange(5.0, 20.0, 2.0)),
+    #     initial_acceleration=[0.01, 0.05],
+    #     max_acceleration=[0.1, 0.4],
+    #     acceleration_step=[0.01, 0.05],
+    #     nw_length=[40, 100],
+    #     nw_bandwidth=[5.0, 20.0],
 
+    #     method='sambo',
+    #     max_tries=100,
+    #     random_state=0,
     #     maximize='Sharpe Ratio',
     #     constraint=lambda p: p.initial_acceleration < p.max_acceleration # A necessary PSAR constraint
     # )
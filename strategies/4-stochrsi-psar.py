@@ -4,10 +4,13 @@ import yfinance as yf
 from backtesting import Backtest, Strategy
 from backtesting.lib import crossover
 
+from common import njit, NUMBA_AVAILABLE, cached_indicator
+
 # --- Custom Indicator Functions ---
 
-def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
-    """Custom implementation of the Parabolic SAR (PSAR) indicator."""
+@njit(cache=True)
+def _psar_core(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """Parabolic SAR recursion over raw float64 arrays (compiled with numba when available)."""
     length = len(high)
     psar_values = np.zeros(length)
     bull = True
@@ -36,38 +39,131 @@ def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
             af = initial_acceleration
 
         if not reverse:
+            # Conditional expressions instead of nested ifs: numba lowers them to
+            # selects, so these data-dependent updates can't be mispredicted.
+            # The comparisons are unchanged, so a NaN bar still leaves everything as is.
             if bull:
-                if high[i] > ep:
-                    ep = high[i]
-                    af = min(af + acceleration_step, max_acceleration)
-                if low[i - 1] < psar_values[i]: psar_values[i] = low[i - 1]
-                if low[i - 2] < psar_values[i]: psar_values[i] = low[i - 2]
+                new_ep = high[i] > ep
+                ep = high[i] if new_ep else ep
+                af = min(af + acceleration_step, max_acceleration) if new_ep else af
+                sar = psar_values[i]
+                sar = low[i - 1] if low[i - 1] < sar else sar
+                psar_values[i] = low[i - 2] if low[i - 2] < sar else sar
             else:
-                if low[i] < ep:
-                    ep = low[i]
-                    af = min(af + acceleration_step, max_acceleration)
-                if high[i - 1] > psar_values[i]: psar_values[i] = high[i - 1]
-                if high[i - 2] > psar_values[i]: psar_values[i] = high[i - 2]
+                new_ep = low[i] < ep
+                ep = low[i] if new_ep else ep
+                af = min(af + acceleration_step, max_acceleration) if new_ep else af
+                sar = psar_values[i]
+                sar = high[i - 1] if high[i - 1] > sar else sar
+                psar_values[i] = high[i - 2] if high[i - 2] > sar else sar
     
-    psar_values[psar_values == 0] = np.nan
+    # The second bar is never computed; leave it empty for cleaner plotting
+    if length > 1:
+        psar_values[1] = np.nan
     return psar_values
 
-def relative_strength_indicator(close: np.ndarray, length: int = 14) -> np.ndarray:
-    """Calculates the Relative Strength Index (RSI)."""
-    close_series = pd.Series(close)
-    delta = close_series.diff(1)
+def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """Custom implementation of the Parabolic SAR (PSAR) indicator."""
+    # Contiguous float64 prices and float parameters, so the kernel compiles only once.
+    return cached_indicator(
+        "psar",
+        _psar_core,
+        (np.ascontiguousarray(high, dtype=np.float64), np.ascontiguousarray(low, dtype=np.float64)),
+        (float(initial_acceleration), float(max_acceleration), float(acceleration_step)),
+    )
+
+@njit(cache=True)
+def _rsi_core(close, length):
+    """RSI in one pass over a float64 array (compiled with numba when available)."""
+    n = len(close)
+    rsi = np.zeros(n)
+    decay = 1.0 - 1.0 / length
+    # Numerators of the adjusted EWMs (com=length-1) of gains and losses. Both
+    # share the same denominator, so it cancels out of avg_gains / avg_losses.
+    weighted_gains = 0.0
+    weighted_losses = 0.0
+
+    for i in range(n):
+        delta = close[i] - close[i - 1] if i > 0 else 0.0
+        gain = delta if delta > 0 else 0.0  # NaN deltas count as no change
+        loss = -delta if delta < 0 else 0.0
+        weighted_gains = gain + decay * weighted_gains
+        weighted_losses = loss + decay * weighted_losses
+
+        # Warm-up bars and a zero average loss (rs = inf or NaN) give an RSI of 0.
+        if i >= length - 1 and weighted_losses > 0.0:
+            rs = weighted_gains / weighted_losses
+            rsi[i] = 100.0 - 100.0 / (1.0 + rs)
+    return rsi
+
+def _rsi_pandas(close, length):
+    """Same RSI as _rsi_core, from pandas EWMs (used when numba isn't installed)."""
+    delta = pd.Series(close).diff(1)
     gains = delta.where(delta > 0, 0)
     losses = -delta.where(delta < 0, 0)
     avg_gains = gains.ewm(com=length - 1, min_periods=length).mean()
     avg_losses = losses.ewm(com=length - 1, min_periods=length).mean()
     rs = avg_gains / avg_losses
     rs = rs.replace([np.inf, -np.inf], np.nan).fillna(0)
-    rsi = 100 - (100 / (1 + rs))
-    return rsi.to_numpy()
+    return (100 - (100 / (1 + rs))).to_numpy()
 
-def stochastic_rsi(close: np.ndarray, rsi_length: int, stoch_length: int, k_smooth: int, d_smooth: int) -> tuple[np.ndarray, np.ndarray]:
-    """Calculates the Stochastic RSI, returning the %K and %D lines."""
-    rsi = relative_strength_indicator(close, length=rsi_length)
+def relative_strength_indicator(close: np.ndarray, length: int = 14) -> np.ndarray:
+    """Calculates the Relative Strength Index (RSI)."""
+    rsi_kernel = _rsi_core if NUMBA_AVAILABLE else _rsi_pandas
+    return rsi_kernel(np.ascontiguousarray(close, dtype=np.float64), int(length))
+
+@njit(cache=True)
+def _window_mean(values, i, window):
+    """Mean of values[i - window + 1:i + 1], NaN if any of them is NaN."""
+    total = 0.0
+    for j in range(i - window + 1, i + 1):
+        total += values[j]
+    return total / window
+
+@njit(cache=True)
+def _stoch_rsi_core(rsi, stoch_length, k_smooth, d_smooth):
+    """Rolling min/max, %K and %D of a finite RSI series in a single pass (compiled with numba when available)."""
+    n = len(rsi)
+    stoch_raw = np.full(n, np.nan)
+    stoch_k = np.full(n, np.nan)
+    stoch_d = np.full(n, np.nan)
+    # Monotonic deques of indices: rsi[min_q[min_head]] is the window minimum and
+    # rsi[max_q[max_head]] the window maximum, each index pushed and popped once.
+    min_q = np.empty(n, dtype=np.int64)
+    max_q = np.empty(n, dtype=np.int64)
+    min_head = min_tail = max_head = max_tail = 0
+
+    for i in range(n):
+        x = rsi[i]
+        while min_tail > min_head and rsi[min_q[min_tail - 1]] >= x:
+            min_tail -= 1
+        min_q[min_tail] = i
+        min_tail += 1
+        if min_q[min_head] <= i - stoch_length:
+            min_head += 1
+        while max_tail > max_head and rsi[max_q[max_tail - 1]] <= x:
+            max_tail -= 1
+        max_q[max_tail] = i
+        max_tail += 1
+        if max_q[max_head] <= i - stoch_length:
+            max_head += 1
+
+        if i >= stoch_length - 1:
+            lowest = rsi[min_q[min_head]]
+            highest = rsi[max_q[max_head]]
+            # A flat window is 0 / 0: left as NaN, like the pandas division did.
+            if highest > lowest:
+                stoch_raw[i] = (x - lowest) / (highest - lowest)
+        # The smoothing windows are a few bars long, so each mean is summed directly:
+        # a running sum would drift and could flip %K/%D crossovers at 0 or 100.
+        if i >= k_smooth - 1:
+            stoch_k[i] = _window_mean(stoch_raw, i, k_smooth) * 100
+        if i >= d_smooth - 1:
+            stoch_d[i] = _window_mean(stoch_k, i, d_smooth)
+    return stoch_k, stoch_d, stoch_raw * 100
+
+def _stoch_rsi_pandas(rsi, stoch_length, k_smooth, d_smooth):
+    """Same lines as _stoch_rsi_core, from pandas rolling windows (used when numba isn't installed)."""
     rsi_series = pd.Series(rsi)
     min_rsi = rsi_series.rolling(window=stoch_length).min()
     max_rsi = rsi_series.rolling(window=stoch_length).max()
@@ -76,6 +172,12 @@ def stochastic_rsi(close: np.ndarray, rsi_length: int, stoch_length: int, k_smoo
     stoch_d = stoch_k.rolling(window=d_smooth).mean()
     return stoch_k.to_numpy(), stoch_d.to_numpy(), stoch_rsi_raw.to_numpy() * 100
 
+def stochastic_rsi(close: np.ndarray, rsi_length: int, stoch_length: int, k_smooth: int, d_smooth: int) -> tuple[np.ndarray, np.ndarray]:
+    """Calculates the Stochastic RSI, returning the %K and %D lines."""
+    rsi = relative_strength_indicator(close, length=rsi_length)
+    stoch_kernel = _stoch_rsi_core if NUMBA_AVAILABLE else _stoch_rsi_pandas
+    return stoch_kernel(rsi, int(stoch_length), int(k_smooth), int(d_smooth))
+
 # --- Define the Combined Strategy ---
 class PSARStochRSIStrategy(Strategy):
     # --- Define Strategy Parameters for Optimization ---
@@ -91,7 +193,11 @@ class PSARStochRSIStrategy(Strategy):
         """This method is called once at the beginning to calculate indicators."""
         self.overbought_level = 50 + self.threshold
         self.oversold_level = 50 - self.threshold
-        self.psar = self.I(psar, self.data.High, self.data.Low, self.psar_iaf, self.psar_maf, self.psar_step, name="PSAR")
+        # Flat, contiguous float64 high/low arrays, prepared once here so the compiled
+        # PSAR gets raw buffers.
+        high = np.ascontiguousarray(self.data.High, dtype=np.float64)
+        low = np.ascontiguousarray(self.data.Low, dtype=np.float64)
+        self.psar = self.I(psar, high, low, self.psar_iaf, self.psar_maf, self.psar_step, name="PSAR")
         self.stoch_k, self.stoch_d, self.stoch = self.I(
             stochastic_rsi,
             self.data.Close,
@@ -1,12 +1,15 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from backtesting import Backtest, Strategy
 from backtesting.lib import crossover
 
+from common import njit, NUMBA_AVAILABLE, get_data
+from bollinger import rolling_stats, trend_indicator
+
 # --- Custom Indicator Functions ---
-def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
-    """Custom implementation of the Parabolic SAR (PSAR) indicator."""
+@njit(cache=True)
+def _psar_core(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """Parabolic SAR recursion over raw float64 arrays (compiled with numba when available)."""
     length = len(high)
     psar_values = np.zeros(length)
     bull = True
@@ -47,41 +50,28 @@ def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
                     af = min(af + acceleration_step, max_acceleration)
                 if high[i - 1] > psar_values[i]: psar_values[i] = high[i - 1]
                 if high[i - 2] > psar_values[i]: psar_values[i] = high[i - 2]
-    
+
+    return psar_values
+
+def psar(high, low, initial_acceleration, max_acceleration, acceleration_step):
+    """Custom implementation of the Parabolic SAR (PSAR) indicator."""
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    psar_values = _psar_core(high, low, float(initial_acceleration), float(max_acceleration), float(acceleration_step))
     psar_values[psar_values == 0] = np.nan
     return psar_values
 
-def bollinger_bands(close: np.ndarray, length: int = 20, std_devs: float = 2.0, ddof: int = 0, column: str = 'Close') -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-    # Moving average
-    df = pd.DataFrame({column: close})
-    rolling = df[column].rolling(window=length, min_periods=length)
-    df['MA'] = rolling.mean()
-    band_distance = std_devs * rolling.std(ddof=ddof)
-    df['BB UP'] = df['MA'] + band_distance
-    df['BB DOWN'] = df['MA'] - band_distance
-    return df['BB UP'].to_numpy(), df['BB DOWN'].to_numpy() #, df['MA'].to_numpy()
-
-
-def trend_indicator(ma, data, up, down) -> np.ndarray:
-    """Custom trend indicator based on moving average crossover."""
-    close = data.Close
-    low = data.Low
-    high = data.High
-    trend = np.zeros(len(close))
-    for i in range(1, len(close)):
-        if close[i] > ma[i] and close[i - 1] <= ma[i - 1]:
-            trend[i] = 1  # Uptrend
-        elif close[i] < ma[i] and close[i - 1] >= ma[i - 1]:
-            trend[i] = -1  # Downtrend
-        else:
-            trend[i] = trend[i - 1]  # No change
-            
-        if low[i] < down[i] and low[i - 1] < down[i - 1]:
-            trend[i] = 0
-        elif high[i] > up[i] and high[i - 1] > up[i - 1]:
-            trend[i] = 0
-            
-    return trend
+def bollinger_bands(close: np.ndarray, length: int = 20, std_devs: float = 2.0, ddof: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ma, rstd = rolling_stats(np.ascontiguousarray(close, dtype=np.float64), int(length), int(ddof))
+    band_distance = std_devs * rstd
+    return ma + band_distance, ma - band_distance #, ma.copy()
+
+
+# Warm _psar_core up at import too, like the band and trend kernels in bollinger.py.
+if NUMBA_AVAILABLE:
+    _warmup = np.ones(3)
+    _psar_core(_warmup, _warmup, 0.02, 0.2, 0.02)
+
 # --- Define the Combined Strategy ---
 class BBPSARStrategy(Strategy):
     # --- Define Strategy Parameters for Optimization ---
@@ -106,12 +96,13 @@ class BBPSARStrategy(Strategy):
 
     def next(self):
         """This method is called for each bar to define the trading logic."""
-        
-        if self.trend[-1] == 1:
+        trend = self.trend[-1]
+
+        if trend == 1:
             if not self.position.is_long:
                 self.position.close()
                 self.buy()
-        elif self.trend[-1] == -1:
+        elif trend == -1:
             if not self.position.is_short:
                 self.position.close()
                 self.sell()
@@ -128,7 +119,7 @@ if __name__ == '__main__':
     ticker_symbol = 'VOO'
     
     print(f"--- Downloading data for {ticker_symbol} ---")
-    data = yf.download(ticker_symbol, start=start_date, end=today, multi_level_index=False)
+    data = get_data(ticker_symbol, start_date, today)
 
     bt = Backtest(data, BBPSARStrategy, cash=100_000, commission=.001)
     
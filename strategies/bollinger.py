@@ -0,0 +1,111 @@
+"""Rolling mean/std and trend kernels shared by the Bollinger Bands strategies (5 and 6)."""
+import numpy as np
+import pandas as pd
+
+from common import njit, NUMBA_AVAILABLE
+
+
+@njit(cache=True)
+def _rolling_mean_std(close, length, ddof):
+    """Rolling mean and std in a single pass over close, from running sums of x and x**2."""
+    n = len(close)
+    ma = np.full(n, np.nan)
+    rstd = np.full(n, np.nan)
+    if n == 0 or length > n:
+        return ma, rstd
+
+    # Deviations from the first close keep s2 - s*s/length from cancelling on large prices
+    shift = close[0]
+    s = 0.0
+    s2 = 0.0
+    for i in range(n):
+        x = close[i] - shift
+        s += x
+        s2 += x * x
+        if i >= length:
+            x_old = close[i - length] - shift
+            s -= x_old
+            s2 -= x_old * x_old
+        if i >= length - 1:
+            var = (s2 - s * s / length) / (length - ddof)
+            ma[i] = shift + s / length
+            rstd[i] = np.sqrt(max(var, 0.0))
+
+    return ma, rstd
+
+
+def _rolling_mean_std_pandas(close, length, ddof):
+    """Same mean and std as _rolling_mean_std, from pandas rolling windows (used when numba isn't installed)."""
+    rolling = pd.Series(close).rolling(window=length, min_periods=length)
+    return rolling.mean().to_numpy(), rolling.std(ddof=ddof).to_numpy()
+
+
+# std_devs only scales the band, so a std_devs sweep reuses the cached mean and std.
+ROLLING_CACHE_SIZE = 64
+_rolling_cache = {}
+
+
+def rolling_stats(close, length, ddof):
+    """Returns the rolling (mean, std) of close, computing them only on a cache miss."""
+    key = (length, ddof, close.shape, hash(close.tobytes()))
+    stats = _rolling_cache.get(key)
+    if stats is None:
+        if len(_rolling_cache) >= ROLLING_CACHE_SIZE:
+            del _rolling_cache[next(iter(_rolling_cache))]  # drop the oldest entry
+        rolling_kernel = _rolling_mean_std if NUMBA_AVAILABLE else _rolling_mean_std_pandas
+        stats = _rolling_cache[key] = rolling_kernel(close, length, ddof)
+    return stats
+
+
+@njit(cache=True)
+def _trend(close, low, high, ma, up, down):
+    """Trend recursion over raw float64 arrays (compiled with numba when available)."""
+    n = len(close)
+    trend = np.zeros(n, dtype=np.int8)
+    for i in range(1, n):
+        # Crossovers as 0/1 flags instead of an if/elif chain: +1 up, -1 down, 0 no change
+        cross_up = (close[i] > ma[i]) & (close[i - 1] <= ma[i - 1])
+        cross_dn = (close[i] < ma[i]) & (close[i - 1] >= ma[i - 1])
+        t = np.int8(cross_up) - np.int8(cross_dn)
+        t = t if t != 0 else trend[i - 1]
+
+        # Two bars in a row outside a band cancel the trend
+        breakout = ((low[i] < down[i]) & (low[i - 1] < down[i - 1])) | ((high[i] > up[i]) & (high[i - 1] > up[i - 1]))
+        trend[i] = 0 if breakout else t
+
+    return trend
+
+
+def _trend_numpy(close, low, high, ma, up, down):
+    """Same trend as _trend, from whole-array masks (used when numba isn't installed)."""
+    n = len(close)
+    if n < 2:
+        return np.zeros(n, dtype=np.int8)
+
+    cross_up = (close[1:] > ma[1:]) & (close[:-1] <= ma[:-1])
+    cross_dn = (close[1:] < ma[1:]) & (close[:-1] >= ma[:-1])
+    breakout = ((low[1:] < down[1:]) & (low[:-1] < down[:-1])) | ((high[1:] > up[1:]) & (high[:-1] > up[:-1]))
+
+    # Each bar takes the value of the last bar that set it (crossover or breakout), forward-filled by index
+    values = np.zeros(n, dtype=np.int8)
+    values[1:] = np.where(breakout, 0, cross_up.astype(np.int8) - cross_dn.astype(np.int8))
+    sets_trend = np.ones(n, dtype=bool)
+    sets_trend[1:] = breakout | cross_up | cross_dn
+    last = np.where(sets_trend, np.arange(n), 0)
+    np.maximum.accumulate(last, out=last)
+    return values[last]
+
+
+def trend_indicator(ma, data, up, down) -> np.ndarray:
+    """Custom trend indicator based on moving average crossover."""
+    as_array = lambda values: np.ascontiguousarray(values, dtype=np.float64)
+    trend_kernel = _trend if NUMBA_AVAILABLE else _trend_numpy
+    return trend_kernel(as_array(data.Close), as_array(data.Low), as_array(data.High),
+                        as_array(ma), as_array(up), as_array(down))
+
+
+# Compile (or load from numba's disk cache) at import, so pool workers don't each pay for it.
+if NUMBA_AVAILABLE:
+    _warmup = np.ones(3)
+    _rolling_mean_std(_warmup, 2, 0)
+    _trend(_warmup, _warmup, _warmup, _warmup, _warmup, _warmup)
@@ -0,0 +1,50 @@
+"""Helpers shared by the strategy scripts, imported from their own folder."""
+import multiprocessing
+from pathlib import Path
+
+import backtesting
+import pandas as pd
+import yfinance as yf
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional: the kernels then run as plain Python
+    NUMBA_AVAILABLE = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Only matters under spawn (Windows, macOS), where backtesting.py runs bt.optimize() on threads.
+backtesting.Pool = multiprocessing.Pool
+
+
+# Indicator results keyed by input hash + parameters, reused across bt.optimize() runs.
+INDICATOR_CACHE_SIZE = 256
+_indicator_cache = {}
+
+
+def cached_indicator(name, func, arrays, params):
+    """Returns func(*arrays, *params), computing it only on a cache miss."""
+    key = (name, func, params) + tuple((a.shape, hash(a.tobytes())) for a in arrays)
+    values = _indicator_cache.get(key)
+    if values is None:
+        if len(_indicator_cache) >= INDICATOR_CACHE_SIZE:
+            del _indicator_cache[next(iter(_indicator_cache))]  # drop the oldest entry
+        values = _indicator_cache[key] = func(*arrays, *params)
+    # A copy, so that nothing downstream can alter the cached result.
+    return values.copy()
+
+
+def get_data(ticker, start, end):
+    """Daily OHLCV from Yahoo Finance, cached on disk per (ticker, start, end)."""
+    path = Path(__file__).resolve().parent / ".cache" / f"{ticker}_{start.date()}_{end.date()}.pkl"
+    if path.exists():
+        return pd.read_pickle(path)
+    data = yf.download(ticker, start=start, end=end, multi_level_index=False)
+    if not data.empty:  # don't cache a failed download
+        path.parent.mkdir(exist_ok=True)
+        data.to_pickle(path)
+    return data